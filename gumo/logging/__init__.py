@@ -1,18 +1,79 @@
-import json
+import functools
+import io
 import logging
 import os
 import sys
-import inspect
 import traceback
-import datetime
-import dataclasses
+import time
 
+from json.encoder import encode_basestring
 from typing import Optional
 from typing import Tuple
 from typing import Callable
+from typing import NamedTuple
 
-@dataclasses.dataclass(frozen=True)
-class LoggerContext:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_LEVEL_TO_NAME = {
+    level: logging.getLevelName(level)
+    for level in (
+        logging.DEBUG,
+        logging.INFO,
+        logging.WARNING,
+        logging.ERROR,
+        logging.CRITICAL,
+        logging.FATAL,
+    )
+}
+
+
+def _get_level_name(level) -> str:
+    name = _LEVEL_TO_NAME.get(level)
+    if name is None:
+        return logging.getLevelName(level)
+    return name
+
+
+@functools.lru_cache(maxsize=256)
+def _get_context_payload_fields(trace: Optional[str], span_id: Optional[str]) -> dict:
+    fields = {}
+    if trace is not None:
+        fields['logging.googleapis.com/trace'] = trace
+    if span_id is not None:
+        fields['logging.googleapis.com/spanId'] = span_id
+    return fields
+
+
+_TEXT_FMT = '[%s]%s:%s:%s: %s'
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class _LazyFormatted:
+    __slots__ = ('payload', 'formatter')
+
+    def __init__(self, payload: dict, formatter: Callable[[dict], str]):
+        self.payload = payload
+        self.formatter = formatter
+
+    def __str__(self):
+        return self.formatter(self.payload)
+
+
+class LoggerContext(NamedTuple):
     trace: Optional[str] = None
     span_id: Optional[str] = None
 
@@ -33,42 +94,54 @@ class GumoLogger:
             logger_context: LoggerContext,
             structured_log_enabled: Optional[bool] = True,
             fetch_logger_context_func: Optional[Callable[[], str]] = None,
+            capture_source_location: Optional[bool] = True,
     ):
         self._project_id = project_id
         self._default_logger = default_logger
         self._error_logger = error_logger
+        self._default_log_fn = default_logger.log
+        self._error_log_fn = error_logger.log
+        self._default_is_enabled_for_fn = default_logger.isEnabledFor
+        self._error_is_enabled_for_fn = error_logger.isEnabledFor
 
         self._logger_context = logger_context
         self._structured_log_enabled = structured_log_enabled
         self._fetch_logger_context_func = fetch_logger_context_func
+        self._capture_source_location = capture_source_location
 
         self._cwd = os.getcwd() + '/'
+        self._cwd_len = len(self._cwd)
 
     def getLevelName(self, level) -> str:
-        from logging import getLevelName
-        return getLevelName(level)
+        return _get_level_name(level)
 
     def _build_message_text(self, msg) -> str:
+        if type(msg) is str:
+            return msg
+
         if isinstance(msg, BaseException):
             err: BaseException = msg
             return '\n'.join([
                 repr(err),
-                traceback.format_exc()
+                ''.join(traceback.format_exception(type(err), err, err.__traceback__))
             ])
 
         return str(msg)
 
-    def _build_log_payload(self, level, msg) -> dict:
+    def _build_timestamp(self) -> str:
+        t = time.time()
+        return '%s.%06dZ' % (time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(t)), int(t % 1 * 1000000))
+
+    def _build_log_payload(self, level, msg, context: LoggerContext) -> dict:
         j = {
-            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'timestamp': self._build_timestamp(),
             'Message': self._build_message_text(msg),
-            'severity': self.getLevelName(level),
+            'severity': _get_level_name(level),
+            **_get_context_payload_fields(context.trace, context.span_id),
         }
 
-        if self._logger_context.trace is not None:
-            j['logging.googleapis.com/trace'] = self._logger_context.trace
-        if self._logger_context.span_id is not None:
-            j['logging.googleapis.com/spanId'] = self._logger_context.span_id
+        if not self._capture_source_location:
+            return j
 
         caller = self._find_caller()
         if caller is not None:
@@ -77,21 +150,50 @@ class GumoLogger:
         return j
 
     def _json_formatter(self, d: dict) -> str:
-        return json.dumps(d, ensure_ascii=False)
+        if orjson is not None:
+            try:
+                return orjson.dumps(d).decode('utf-8')
+            except orjson.JSONEncodeError:
+                pass
+        return self._json_template_formatter(d)
+
+    def _json_template_formatter(self, d: dict) -> str:
+        fields = [
+            '"timestamp":' + encode_basestring(d['timestamp']),
+            '"Message":' + encode_basestring(d['Message']),
+            '"severity":' + encode_basestring(d['severity']),
+        ]
+
+        trace = d.get('logging.googleapis.com/trace')
+        if trace is not None:
+            fields.append('"logging.googleapis.com/trace":' + encode_basestring(trace))
+        span_id = d.get('logging.googleapis.com/spanId')
+        if span_id is not None:
+            fields.append('"logging.googleapis.com/spanId":' + encode_basestring(span_id))
+
+        caller = d.get('logging.googleapis.com/sourceLocation')
+        if caller is not None:
+            fields.append('"logging.googleapis.com/sourceLocation":{"file":%s,"line":%d,"function":%s}' % (
+                encode_basestring(caller['file']),
+                caller['line'],
+                encode_basestring(caller['function']),
+            ))
+
+        return '{' + ','.join(fields) + '}'
 
     def _log_text_formatter(self, d: dict) -> str:
         line = d.get('logging.googleapis.com/sourceLocation', {}).get('line', '-')
         file = d.get('logging.googleapis.com/sourceLocation', {}).get('file', '<unknown>')
-        file = file.replace(self._cwd, '')
-
-        msg = '[{timestamp}]{severity}:{file}:{line}: {message}'.format(
-            timestamp=datetime.datetime.now(),
-            severity=d.get('severity'),
-            file=file,
-            line=line,
-            message=d.get('Message')
+        if file.startswith(self._cwd):
+            file = file[self._cwd_len:]
+
+        return _TEXT_FMT % (
+            d.get('timestamp'),
+            d.get('severity'),
+            file,
+            line,
+            d.get('Message'),
         )
-        return msg
 
     def _formatter(self, d: dict) -> str:
         if self._structured_log_enabled:
@@ -99,24 +201,28 @@ class GumoLogger:
         else:
             return self._log_text_formatter(d)
 
-    def _fetch_logger_context(self):
-        if self._fetch_logger_context_func is None:
-            return
-
-        context = self._fetch_logger_context_func()
-        if context is None:
-            return
-        self._logger_context = context
-
+    def isEnabledFor(self, level) -> bool:
+        if level >= self.ERROR:
+            return self._error_is_enabled_for_fn(level)
+        return self._default_is_enabled_for_fn(level)
 
     def _log(self, level, msg):
-        self._fetch_logger_context()
-
-        payload = self._build_log_payload(level=level, msg=msg)
         if level >= self.ERROR:
-            self._error_logger.log(level, self._formatter(payload))
+            is_enabled_for_fn, log_fn = self._error_is_enabled_for_fn, self._error_log_fn
         else:
-            self._default_logger.log(level, self._formatter(payload))
+            is_enabled_for_fn, log_fn = self._default_is_enabled_for_fn, self._default_log_fn
+
+        if not is_enabled_for_fn(level):
+            return
+
+        context = None
+        if self._fetch_logger_context_func is not None:
+            context = self._fetch_logger_context_func()
+        if context is None:
+            context = self._logger_context
+
+        payload = self._build_log_payload(level=level, msg=msg, context=context)
+        log_fn(level, _LazyFormatted(payload, self._formatter))
 
     def debug(self, msg):
         self._log(level=self.DEBUG, msg=msg)
@@ -143,29 +249,25 @@ class GumoLogger:
         self._log(level=level, msg=msg)
 
     def _find_caller(self) -> Optional[dict]:
-        caller_stack: Optional[inspect.FrameInfo] = None
+        logger_class = type(self)
+        frame = sys._getframe(1)
         callee_is_custom_logger = False
 
-        for stack in inspect.stack():
-            stack: inspect.FrameInfo = stack
-            stack_self = stack.frame.f_locals.get('self')
-            stack_in_custom_logger = stack_self is not None and isinstance(stack_self, self.__class__)
-
-            if stack_in_custom_logger:
+        while frame is not None:
+            if type(frame.f_locals.get('self')) is logger_class:
                 callee_is_custom_logger = True
-            else:
-                if callee_is_custom_logger:
-                    caller_stack = stack
-                    break
+            elif callee_is_custom_logger:
+                break
+
+            frame = frame.f_back
 
-        if caller_stack is None:
+        if frame is None:
             return
 
-        file: str = caller_stack.filename
         return {
-            'file': file,
-            'line': caller_stack.lineno,
-            'function': caller_stack.function,
+            'file': frame.f_code.co_filename,
+            'line': frame.f_lineno,
+            'function': frame.f_code.co_name,
         }
 
 
@@ -180,9 +282,12 @@ class LoggerManager:
     def __init__(
             self,
             fetch_logger_context_func: Optional[Callable[[], str]] = None,
+            capture_source_location: Optional[bool] = True,
     ):
         self._project_id = os.environ.get('GOOGLE_CLOUD_PROJECT', '<unknown-project>')
+        self._trace_prefix = f'projects/{self._project_id}/traces/'
         self._fetch_logger_context_func = fetch_logger_context_func
+        self._capture_source_location = capture_source_location
 
         is_google_platform = os.environ.get('GAE_DEPLOYMENT_ID') is not None
         self._structured_log_enabled = is_google_platform
@@ -193,29 +298,57 @@ class LoggerManager:
             level=self.DEBUG
         )
         self._error_logger, self._error_handler = self._build_logger(
-            logger_name='default_logger',
+            logger_name='error_logger',
             stream=sys.stderr,
             level=self.DEBUG
         )
 
-    @staticmethod
-    def _build_logger(logger_name, stream, level) -> Tuple[logging.Logger, logging.Handler]:
-        formatter = logging.Formatter('%(message)s')
+        self._logger = self._build_gumo_logger(logger_context=LoggerContext())
 
-        handler = logging.StreamHandler(stream=stream)
-        handler.setLevel(level)
-        handler.setFormatter(formatter)
+    STREAM_BUFFER_SIZE = 65536
+
+    @classmethod
+    def _build_buffered_stream(cls, stream):
+        if stream is not sys.stdout and stream is not sys.stderr:
+            return stream
 
+        try:
+            fd = stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return stream
+
+        stream.flush()
+        return io.TextIOWrapper(
+            io.BufferedWriter(io.FileIO(fd, mode='w', closefd=False), buffer_size=cls.STREAM_BUFFER_SIZE),
+            encoding=stream.encoding,
+            errors=stream.errors,
+            line_buffering=False,
+            write_through=False,
+        )
+
+    @classmethod
+    def _build_logger(cls, logger_name, stream, level) -> Tuple[logging.Logger, logging.Handler]:
         logger = logging.getLogger(logger_name)
         logger.propagate = False
         logger.setLevel(level)
-        if not logger.hasHandlers():
-            logger.addHandler(handler)
+        if logger.handlers:
+            return (logger, logger.handlers[0])
+
+        formatter = logging.Formatter('%(message)s')
+
+        buffered_stream = cls._build_buffered_stream(stream)
+        if buffered_stream is stream:
+            handler = logging.StreamHandler(stream=stream)
+        else:
+            handler = _BufferedStreamHandler(stream=buffered_stream)
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+
+        logger.addHandler(handler)
         return (logger, handler)
 
     def getLevelName(self, level) -> str:
-        from logging import getLevelName
-        return getLevelName(level)
+        return _get_level_name(level)
 
     def flush(self):
         self._default_handler.flush()
@@ -225,17 +358,17 @@ class LoggerManager:
         if trace_header is None:
             return (None, None)
 
-        trace_id = None
-        span_id = None
-
-        if trace_header.find('/') >= 0:
-            trace_id, span_id = trace_header.split('/', )
-            if span_id.find(';') >= 0:
-                span_id = span_id.split(';')[0]
+        trace_id, sep, rest = trace_header.partition('/')
+        if sep:
+            span_id = rest.partition(';')[0] or None
+        else:
+            trace_id = trace_id.partition(';')[0]
+            span_id = None
 
-        trace = f'projects/{self._project_id}/traces/{trace_id}'
+        if not trace_id:
+            return (None, None)
 
-        return (trace, span_id)
+        return (self._trace_prefix + trace_id, span_id)
 
     def getLoggerContext(self, trace_header: Optional[str] = None) -> LoggerContext:
         trace, span_id = self._build_trace_and_span(trace_header)
@@ -244,9 +377,7 @@ class LoggerManager:
             span_id=span_id,
         )
 
-    def getLogger(self, trace_header: Optional[str] = None) -> GumoLogger:
-        logger_context = self.getLoggerContext(trace_header=trace_header)
-
+    def _build_gumo_logger(self, logger_context: LoggerContext) -> GumoLogger:
         return GumoLogger(
             project_id=self._project_id,
             default_logger=self._default_logger,
@@ -254,4 +385,11 @@ class LoggerManager:
             logger_context=logger_context,
             structured_log_enabled=self._structured_log_enabled,
             fetch_logger_context_func=self._fetch_logger_context_func,
+            capture_source_location=self._capture_source_location,
         )
+
+    def getLogger(self, trace_header: Optional[str] = None) -> GumoLogger:
+        if trace_header is None:
+            return self._logger
+
+        return self._build_gumo_logger(logger_context=self.getLoggerContext(trace_header=trace_header))
@@ -17,9 +17,7 @@ def on_before_request():
     flask.g.logger_context = logger_manager.getLoggerContext(
         trace_header=flask.request.headers.get('X-Cloud-Trace-Context')
     )
-    flask.g.logger = logger_manager.getLogger(
-        trace_header=flask.request.headers.get('X-Cloud-Trace-Context')
-    )
+    flask.g.logger = logger
 
 
 @app.after_request
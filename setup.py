@@ -5,6 +5,9 @@ name = 'gumo-logging'
 version = '0.0.2'
 description = 'Gumo Logging Library'
 dependencies = []
+extras_dependencies = {
+    'orjson': ['orjson'],
+}
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
@@ -30,4 +33,5 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     install_requires=dependencies,
+    extras_require=extras_dependencies,
 )
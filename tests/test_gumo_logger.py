@@ -0,0 +1,93 @@
+import json
+import types
+
+import pytest
+
+from gumo.logging import LoggerManager
+
+
+def _raise(exc):
+    raise exc
+
+
+def test_exception_message_uses_its_own_traceback():
+    logger = LoggerManager().getLogger()
+
+    try:
+        _raise(ValueError('logged'))
+    except ValueError as e:
+        logged = e
+
+    try:
+        _raise(KeyError('active'))
+    except KeyError:
+        text = logger._build_message_text(logged)
+
+    assert text.startswith("ValueError('logged')\nTraceback (most recent call last):\n")
+    assert text.endswith('ValueError: logged\n')
+    assert 'KeyError' not in text
+
+
+def test_exception_message_without_traceback():
+    logger = LoggerManager().getLogger()
+
+    text = logger._build_message_text(ValueError('not raised'))
+
+    assert text == "ValueError('not raised')\nValueError: not raised\n"
+    assert 'NoneType: None' not in text
+
+
+def test_payload_accepts_any_context_with_trace_and_span_id():
+    context = types.SimpleNamespace(trace='projects/p/traces/abc', span_id=None)
+    logger = LoggerManager(fetch_logger_context_func=lambda: context).getLogger()
+
+    payload = logger._build_log_payload(LoggerManager.INFO, 'message', context)
+
+    assert payload['logging.googleapis.com/trace'] == 'projects/p/traces/abc'
+    assert 'logging.googleapis.com/spanId' not in payload
+
+
+def test_json_formatter_accepts_lone_surrogates():
+    logger = LoggerManager().getLogger()
+    payload = logger._build_log_payload(LoggerManager.INFO, 'path: /tmp/\udcff', logger._logger_context)
+
+    text = logger._json_formatter(payload)
+
+    assert json.loads(text) == payload
+
+
+@pytest.mark.parametrize('payload', [
+    {
+        'timestamp': '2026-01-01T00:00:00.000000Z',
+        'Message': 'plain message',
+        'severity': 'INFO',
+    },
+    {
+        'timestamp': '2026-01-01T00:00:00.000000Z',
+        'Message': 'quote " backslash \\ newline \n tab \t control \x01 unicode é 日本',
+        'severity': 'ERROR',
+        'logging.googleapis.com/trace': 'projects/p/traces/"abc"',
+        'logging.googleapis.com/spanId': '123',
+        'logging.googleapis.com/sourceLocation': {
+            'file': '/srv/app "x"\\main.py',
+            'line': 42,
+            'function': '<module>',
+        },
+    },
+    {
+        'timestamp': '2026-01-01T00:00:00.000000Z',
+        'Message': 'only trace',
+        'severity': 'WARNING',
+        'logging.googleapis.com/trace': 'projects/p/traces/abc',
+    },
+    {
+        'timestamp': '2026-01-01T00:00:00.000000Z',
+        'Message': 'only source location',
+        'severity': 'DEBUG',
+        'logging.googleapis.com/sourceLocation': {'file': 'main.py', 'line': 1, 'function': 'f'},
+    },
+])
+def test_json_template_formatter_round_trips(payload):
+    logger = LoggerManager().getLogger()
+
+    assert json.loads(logger._json_template_formatter(payload)) == payload
@@ -0,0 +1,81 @@
+import copy
+import logging
+import pickle
+
+import pytest
+
+from gumo.logging import LoggerManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv('GOOGLE_CLOUD_PROJECT', 'gumo-core-test')
+    return LoggerManager()
+
+
+@pytest.mark.parametrize('trace_header, expected', [
+    (None, (None, None)),
+    ('', (None, None)),
+    ('abc', ('projects/gumo-core-test/traces/abc', None)),
+    ('abc;o=1', ('projects/gumo-core-test/traces/abc', None)),
+    ('abc/123', ('projects/gumo-core-test/traces/abc', '123')),
+    ('abc/123;o=1', ('projects/gumo-core-test/traces/abc', '123')),
+    ('abc/', ('projects/gumo-core-test/traces/abc', None)),
+    ('abc/123/456;o=1', ('projects/gumo-core-test/traces/abc', '123/456')),
+    ('/123', (None, None)),
+])
+def test_build_trace_and_span(manager, trace_header, expected):
+    assert manager._build_trace_and_span(trace_header) == expected
+
+
+def test_logger_context_is_copyable_and_picklable(manager):
+    context = manager.getLoggerContext('abc/123;o=1')
+
+    assert copy.copy(context) == context
+    assert pickle.loads(pickle.dumps(context)) == context
+
+
+def _build_manager_on_captured_streams(monkeypatch):
+    monkeypatch.setenv('GOOGLE_CLOUD_PROJECT', 'gumo-core-test')
+    # LoggerManager instances from earlier tests already installed handlers on
+    # these process-wide loggers, bound to streams captured at that time; start
+    # from empty handler lists so this manager installs handlers on capfd's streams.
+    for name in ('default_logger', 'error_logger'):
+        monkeypatch.setattr(logging.getLogger(name), 'handlers', [])
+
+    return LoggerManager()
+
+
+def test_error_logs_go_to_stderr(monkeypatch, capfd):
+    manager = _build_manager_on_captured_streams(monkeypatch)
+    logger = manager.getLogger()
+
+    logger.info('info message')
+    logger.error('error message')
+    manager.flush()
+
+    captured = capfd.readouterr()
+    assert 'info message' in captured.out
+    assert 'error message' not in captured.out
+    assert 'error message' in captured.err
+    assert 'info message' not in captured.err
+
+
+def test_logs_are_buffered_until_flush(monkeypatch, capfd):
+    manager = _build_manager_on_captured_streams(monkeypatch)
+    logger = manager.getLogger()
+
+    logger.info('buffered message')
+    assert capfd.readouterr().out == ''
+
+    manager.flush()
+    assert 'buffered message' in capfd.readouterr().out
+
+
+def test_error_logs_are_written_without_flush(monkeypatch, capfd):
+    manager = _build_manager_on_captured_streams(monkeypatch)
+    logger = manager.getLogger()
+
+    logger.error('error message')
+
+    assert 'error message' in capfd.readouterr().err